@@ -1,22 +1,20 @@
-import pandas as pd
+import numpy as np
 import tkinter as tk
 from tkinter import ttk
 from datetime import timedelta
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import seaborn as sns
 from matplotlib.gridspec import GridSpec
+from io_utils import load_main
 
 # -----------------------------
 # 1. Load Excel
 # -----------------------------
-df = pd.read_excel("Documents/Mar24_Mar25_Cleansed.xlsx", sheet_name="Main")
+df = load_main()  # Date is already parsed by the loader
 required = {"Attendee ID", "Activity ID", "Date"}
 if not required.issubset(df.columns):
     raise ValueError(f"Excel must contain: {required}")
 
-df["Date"] = pd.to_datetime(df["Date"])
-
 # -----------------------------
 # 2. Filter last 2 months
 # -----------------------------
@@ -29,28 +27,40 @@ df = df[df["Date"] >= cutoff]
 # -----------------------------
 df = df.drop_duplicates(subset=["Attendee ID", "Date"])
 df = df[df["Date"].dt.dayofweek < 5]
-df["Week"] = df["Date"] - pd.to_timedelta(df["Date"].dt.dayofweek, unit="d")
+dow = df["Date"].dt.dayofweek.to_numpy(np.int64)
+df["Week"] = df["Date"].to_numpy() - dow.astype("timedelta64[D]")  # Monday of each week, same unit as Date
 
+# Rows are already unique per (Attendee ID, Date), so size() counts days attended
 weekly = (
-    df.groupby(["Attendee ID", "Week"])["Date"]
-    .nunique()
+    df.groupby(["Attendee ID", "Week"], sort=False, observed=True)
+    .size()
+    .clip(upper=5)
     .reset_index(name="Days_Attended")
 )
-weekly["Days_Attended"] = weekly["Days_Attended"].clip(upper=5)
 
 # -----------------------------
 # 4. Sort participants
 # -----------------------------
-totals = weekly.groupby("Attendee ID")["Days_Attended"].sum().reset_index(name="Total")
-sorted_ids = totals.sort_values(by="Total", ascending=False)["Attendee ID"].tolist()
+totals = weekly.groupby("Attendee ID", sort=False, observed=True)["Days_Attended"].sum().reset_index(name="Total")
+# Ties broken by Attendee ID so the order (and range grouping) never depends on row order
+sorted_ids = totals.sort_values(by=["Total", "Attendee ID"], ascending=[False, True])["Attendee ID"].tolist()
 total_count = len(sorted_ids)
 
-# Pivot table for heatmap
+# Pivot for heatmap: (Attendee ID, Week) is already unique, so a plain
+# unstack reshapes without pivot_table's extra aggregation pass
 pivot_df = (
-    weekly.pivot_table(index="Attendee ID", columns="Week", values="Days_Attended", fill_value=0)
+    weekly.set_index(["Attendee ID", "Week"])["Days_Attended"]
+    .unstack(fill_value=0)
     .reindex(sorted_ids)
+    .sort_index(axis=1)
+    .astype(np.uint8)  # days per week are 0–5; 1 byte per cell instead of 8
 )
-pivot_df = pivot_df.reindex(sorted(pivot_df.columns), axis=1)
+
+# Weeks are the same for every participant range, so format x labels once
+xtick_labels = [
+    f"Week {d.isocalendar().week} – {d.strftime('%b')} – {d.year}"
+    for d in pivot_df.columns
+]
 
 # -----------------------------
 # 5. Tkinter UI
@@ -78,6 +88,10 @@ group_var = tk.StringVar()
 # Create frame for group buttons
 ttk.Label(control_frame, text="Divide participants into:", font=("Arial", 11)).grid(row=0, column=0, padx=5)
 
+# Range label -> (attendee IDs, rows of pivot_arr), rebuilt whenever the grouping changes
+pivot_arr = pivot_df.to_numpy()
+buckets = {}
+
 def update_groups(*args):
     """Recalculate groups and update dropdown dynamically."""
     num_groups = num_groups_var.get()
@@ -86,9 +100,16 @@ def update_groups(*args):
     groups = [(i * group_size + 1, min((i + 1) * group_size, total_count)) for i in range(num_groups)]
     group_labels = [f"{a}-{b}" for a, b in groups]
 
+    # pivot_df rows follow sorted_ids, so each range is a zero-copy view of pivot_arr
+    buckets.clear()
+    buckets.update({
+        label: (pivot_df.index[a - 1:b], pivot_arr[a - 1:b])
+        for (a, b), label in zip(groups, group_labels)
+    })
+
     dropdown["values"] = group_labels
     group_var.set(group_labels[0])
-    plot_group()  # redraw with new grouping
+    root.after_idle(plot_group)  # redraw with new grouping once Tk is idle
 
 # Radio buttons for group selection
 group_options = [5, 10, 20, 30, 40, 50]
@@ -111,44 +132,46 @@ cbar_ax = fig.add_subplot(gs[0, 1])
 canvas = FigureCanvasTkAgg(fig, master=frame)
 canvas.get_tk_widget().pack(fill="both", expand=True, pady=10)
 
+# One persistent image + colorbar; plot_group only swaps the data, so the
+# mesh, colorbar and week labels are not rebuilt on every selection
+n_weeks = pivot_df.shape[1]
+im = ax.imshow(np.zeros((1, n_weeks)), cmap="YlOrRd", vmin=0, vmax=5, aspect="auto", interpolation="nearest")
+fig.colorbar(im, cax=cbar_ax)
+
+ax.set_xlabel("Week Starting (Monday)")
+ax.set_ylabel("Attendee ID")
+ax.set_xticks(range(n_weeks))
+ax.set_xticklabels(xtick_labels, rotation=45, ha="right")
+
+# Thin gray cell borders (as the previous seaborn heatmap drew them)
+ax.set_xticks(np.arange(n_weeks + 1) - 0.5, minor=True)
+ax.grid(which="minor", color="gray", linewidth=0.3)
+ax.tick_params(which="minor", length=0)
+
+fig.subplots_adjust(bottom=0.25, right=0.93, top=0.9, wspace=0.05)
+
 # -----------------------------
 # 7. Plot function
 # -----------------------------
 def plot_group(event=None):
-    ax.clear()
     selection = group_var.get()
     if not selection:
         return
 
     start, end = map(int, selection.split("-"))
-    subset_ids = sorted_ids[start - 1:end]
-    sub = pivot_df.loc[subset_ids]
-
-    sns.heatmap(
-        sub,
-        cmap="YlOrRd",
-        linewidths=0.3,
-        linecolor="gray",
-        vmin=0,
-        vmax=5,
-        cbar_ax=cbar_ax,
-        cbar=True,
-        ax=ax
-    )
+    ids, arr = buckets[selection]
 
+    im.set_data(arr)
+    im.set_extent((-0.5, arr.shape[1] - 0.5, arr.shape[0] - 0.5, -0.5))
+
+    # Thin the ID labels on large ranges (seaborn's "auto" behaviour)
+    step = max(1, -(-arr.shape[0] // 40))
+    ax.set_yticks(range(0, arr.shape[0], step))
+    ax.set_yticklabels(ids[::step])
+    ax.set_yticks(np.arange(arr.shape[0] + 1) - 0.5, minor=True)
     ax.set_title(f"Participants {start}–{end} (of {total_count})", fontsize=13)
-    ax.set_xlabel("Week Starting (Monday)")
-    ax.set_ylabel("Attendee ID")
-
-    # Clean formatted X-axis
-    xtick_labels = [
-        f"Week {d.isocalendar().week} – {d.strftime('%b')} – {d.year}"
-        for d in sub.columns
-    ]
-    ax.set_xticklabels(xtick_labels, rotation=45, ha="right")
-
-    fig.subplots_adjust(bottom=0.25, right=0.93, top=0.9, wspace=0.05)
-    canvas.draw()
+
+    canvas.draw_idle()  # coalesces rapid selection changes into one render
 
 # -----------------------------
 # 8. Initialize Default Group & Plot
@@ -8,13 +8,15 @@
 
 import pandas as pd
 import numpy as np
+from io_utils import load_main
 
 FILE_PATH = "Documents/Mar24_Mar25_Cleansed.xlsx"
 SHEET = "Main"
+COLUMNS = ["Attendee ID", "Date", "Gender", "RajiNewColumn-Age", "DOB",
+           "Activity type", "Constituency", "IMD rank"]
 
 def generate_descriptive_summary():
-    df = pd.read_excel(FILE_PATH, sheet_name=SHEET)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = load_main(FILE_PATH, SHEET, columns=COLUMNS, dtype={"IMD rank": "Int32"})  # Date is already parsed
     df = df.dropna(subset=["Date"])
 
     # --- Prepare Age if missing ---
@@ -31,28 +33,33 @@ def generate_descriptive_summary():
 
     # Gender %
     if "Gender" in df_unique.columns:
-        gender_clean = df_unique["Gender"].str.lower().str.strip()
-        male_count = gender_clean.eq("male").sum()
-        female_count = gender_clean.eq("female").sum()
+        # Normalise the few category labels, then count rows by int code
+        gender = df_unique["Gender"].astype("category")
+        labels = gender.cat.categories.astype(str).str.strip().str.lower()
+        codes = gender.cat.codes.to_numpy()
+        male_count = np.isin(codes, np.flatnonzero(labels == "male")).sum()
+        female_count = np.isin(codes, np.flatnonzero(labels == "female")).sum()
         total_gender = male_count + female_count
         male_pct = round((male_count / total_gender) * 100, 1) if total_gender > 0 else np.nan
         female_pct = round((female_count / total_gender) * 100, 1) if total_gender > 0 else np.nan
     else:
         male_pct = female_pct = np.nan
 
-    # Unique attendances per attendee
-    attendances_per_attendee = df_unique.groupby("Attendee ID").size()
-    mean_attendances = round(attendances_per_attendee.mean(), 1)
-    max_attendances = int(attendances_per_attendee.max())
-    min_attendances = int(attendances_per_attendee.min())
+    # First/last attendance and unique attendances per attendee (one groupby pass)
+    attendance = (
+        df_unique.groupby("Attendee ID", sort=False, observed=True)["Date"]
+        .agg(["min", "max", "size"])
+        .rename(columns={"size": "Attendances"})
+    )
+    mean_attendances = round(attendance["Attendances"].mean(), 1)
+    max_attendances = int(attendance["Attendances"].max())
+    min_attendances = int(attendance["Attendances"].min())
 
     # Months active per attendee
-    attendance = df_unique.groupby("Attendee ID")["Date"].agg(["min", "max"])
     attendance["MonthsActive"] = (attendance["max"] - attendance["min"]) / pd.Timedelta(days=30)
     median_months_active = round(attendance["MonthsActive"].median(), 1)
 
     # Average attendances per month (normalized engagement)
-    attendance["Attendances"] = attendances_per_attendee
     attendance["AttendancesPerMonth"] = attendance["Attendances"] / attendance["MonthsActive"].replace(0, np.nan)
     avg_attendances_per_month = round(attendance["AttendancesPerMonth"].mean(), 1)
 
@@ -79,43 +86,28 @@ def generate_descriptive_summary():
     pct6 = round(drop6 / len(valid_6) * 100, 1) if len(valid_6) > 0 else 0
 
     # --- Output summary ---
-    summary = pd.DataFrame({
-        "Metric": [
-            "Total Participants",
-            "Avg. Age",
-            "% Male",
-            "% Female",
-            "Mean Attendances per Attendee (Total)",
-            "Average Attendances per Month",
-            "Median Months Active",
-            "Upper Limit (Max Attendances)",
-            "Lower Limit (Min Attendances)",
-            "Top Activity",
-            "Top Constituency",
-            "Avg. IMD Rank",
-            "Dropout 3-Month",
-            "Dropout 6-Month"
-        ],
-        "Value": [
-            f"{total_participants:,}",
-            f"{avg_age} years",
-            f"{male_pct}%",
-            f"{female_pct}%",
-            mean_attendances,
-            avg_attendances_per_month,
-            median_months_active,
-            max_attendances,
-            min_attendances,
-            top_activity,
-            top_constituency,
-            f"{avg_imd} (high deprivation)" if isinstance(avg_imd, int) else "N/A",
-            f"{pct3}%",
-            f"{pct6}%"
-        ]
-    })
+    rows = [
+        ("Total Participants", f"{total_participants:,}"),
+        ("Avg. Age", f"{avg_age} years"),
+        ("% Male", f"{male_pct}%"),
+        ("% Female", f"{female_pct}%"),
+        ("Mean Attendances per Attendee (Total)", mean_attendances),
+        ("Average Attendances per Month", avg_attendances_per_month),
+        ("Median Months Active", median_months_active),
+        ("Upper Limit (Max Attendances)", max_attendances),
+        ("Lower Limit (Min Attendances)", min_attendances),
+        ("Top Activity", top_activity),
+        ("Top Constituency", top_constituency),
+        ("Avg. IMD Rank", f"{avg_imd} (high deprivation)" if isinstance(avg_imd, int) else "N/A"),
+        ("Dropout 3-Month", f"{pct3}%"),
+        ("Dropout 6-Month", f"{pct6}%"),
+    ]
 
     print("\n📋 Descriptive Statistics Summary:\n")
-    print(summary.to_string(index=False))
+    print("\n".join(f"{m:<38} {v}" for m, v in rows))
+
+    # Returned as a DataFrame for callers that expect one
+    summary = pd.DataFrame(rows, columns=["Metric", "Value"])
     return summary
 
 
@@ -0,0 +1,114 @@
+# io_utils.py
+# -------------------------------------------------------
+# Shared loader for the cleansed FFP workbook.
+# Parsing the xlsx with openpyxl is the slowest step of every
+# script, so the sheet is cached as Parquet next to the workbook
+# and only re-read from Excel when the workbook changes.
+# -------------------------------------------------------
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+FILE_PATH = "Documents/Mar24_Mar25_Cleansed.xlsx"
+SHEET = "Main"
+
+# Repeatedly grouped columns; as categoricals, groupbys run on small int codes
+CAT_COLS = ["Attendee ID", "Activity type", "Gender", "Constituency", "Ward"]
+
+# Text cells read_excel would treat as missing (the sheet uses "NA")
+NA_VALUES = ["", "NA", "N/A", "n/a", "#N/A", "NULL", "null", "NaN", "nan", "None"]
+
+
+def _read_sheet(xlsx, sheet):
+    """Stream one sheet with openpyxl in read-only mode into a DataFrame.
+
+    Same result as read_excel for this workbook, without pandas' per-cell
+    conversion and text parser pass over every value.
+    """
+    wb = load_workbook(xlsx, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = list(wb[sheet].iter_rows(values_only=True))
+    finally:
+        wb.close()
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+
+    header = [f"Unnamed: {i}" if h is None else str(h).strip() for i, h in enumerate(rows[0])]
+    df = pd.DataFrame(rows[1:], columns=header)
+    obj_cols = df.columns[df.dtypes == object]
+    df[obj_cols] = df[obj_cols].replace(NA_VALUES, None)
+    return df.infer_objects()
+
+
+def _arrow_safe(df):
+    """Store mixed-type object columns (e.g. DOB with dates and '10/2010') as text."""
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def arrow_strings(df):
+    """Hold the remaining text columns as Arrow-backed strings instead of Python objects."""
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True) in ("string", "empty"):
+            df[col] = df[col].astype("string[pyarrow]")
+    return df
+
+
+def categorize(df):
+    """Cast the CAT_COLS present in df to category dtype."""
+    for c in CAT_COLS:
+        if c in df:
+            df[c] = df[c].astype("category")
+    return df
+
+
+def _build_cache(xlsx, sheet, cache):
+    """Parse the sheet from Excel once and write it to the Parquet cache."""
+    df = _read_sheet(xlsx, sheet)
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+
+    df = categorize(_arrow_safe(df))
+    # Write next to the cache and swap it in, so other processes (main.py
+    # starts scripts in parallel) never see a half-written file
+    tmp = cache.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        df.to_parquet(tmp, compression="zstd")
+        os.replace(tmp, cache)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _read_cache(cache, columns):
+    if columns is not None:
+        names = pq.read_schema(cache).names
+        columns = [c for c in columns if c in names]
+    return pd.read_parquet(cache, columns=columns)
+
+
+def load_main(xlsx=FILE_PATH, sheet=SHEET, columns=None, dtype=None):
+    """Load a sheet of the workbook, reusing the Parquet cache while it is fresh.
+
+    columns limits what is read (names missing from the sheet are skipped);
+    dtype maps column -> dtype and is applied after loading.
+    """
+    p = Path(xlsx)
+    cache = p.with_name(f"{p.stem}_{sheet}.parquet")
+    if not (cache.exists() and cache.stat().st_mtime >= p.stat().st_mtime):
+        _build_cache(p, sheet, cache)
+
+    try:
+        df = _read_cache(cache, columns)
+    except (OSError, ValueError):  # unreadable cache (e.g. truncated): rebuild it
+        _build_cache(p, sheet, cache)
+        df = _read_cache(cache, columns)
+    df = arrow_strings(categorize(df))
+    if dtype:
+        df = df.astype({c: t for c, t in dtype.items() if c in df})
+    return df
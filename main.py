@@ -9,7 +9,6 @@ import subprocess
 import sys
 import os
 sys.path.append(os.path.dirname(__file__))  # ensures current folder is visible
-from trend_summary import generate_trend_summary   # 👈 import summary logic
 
 
 # ----------------------------------------------------
@@ -29,6 +28,8 @@ def run_script(script_name):
 # ----------------------------------------------------
 def show_summary():
     try:
+        # Imported on first use so pandas does not delay the dashboard window
+        from trend_summary import generate_trend_summary   # 👈 import summary logic
         summary_text = generate_trend_summary()
         summary_box.config(state="normal")
         summary_box.delete(1.0, tk.END)
@@ -1,16 +1,27 @@
 import sys
 import os
+import numpy as np
 import pandas as pd
-from PyQt5.QtCore import QSize, Qt, QProcess
+from PyQt5.QtCore import QSize, Qt, QProcess, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QScrollArea
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QScrollArea, QSizePolicy
 )
-from PyQt5.QtGui import QIcon, QPixmap, QPainter, QColor, QFont
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
+from PyQt5.QtGui import QIcon, QPixmap, QPainter, QColor, QFont, QImage
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from io_utils import load_main
+
+_ICON_CACHE = {}  # size -> QIcon
 
 # Raji add Raji New columm Age and Range by python - Important
 def make_excel_icon(size=32):
+    """Excel-like icon for the given size, drawn once and shared (QIcon is implicitly shared)."""
+    if size not in _ICON_CACHE:
+        _ICON_CACHE[size] = _render_excel_icon(size)
+    return _ICON_CACHE[size]
+
+
+def _render_excel_icon(size):
     """Draw an Excel-like icon (two-tone green + white X + grid lines)."""
     pixmap = QPixmap(size, size)
     pixmap.fill(Qt.transparent)
@@ -30,6 +41,43 @@ def make_excel_icon(size=32):
     return QIcon(pixmap)
 
 
+def retention_counts(codes, months, latest, prev, n_ids):
+    """Sessions per attendee code in the previous and latest month (one C pass each)."""
+    c_prev = np.bincount(codes[months == prev], minlength=n_ids)
+    c_last = np.bincount(codes[months == latest], minlength=n_ids)
+    return c_prev, c_last
+
+
+class ChartSignals(QObject):
+    rendered = pyqtSignal(int, int, QImage)
+
+
+class ChartJob(QRunnable):
+    """Render one chart with the Agg backend off the GUI thread and emit it as a QImage."""
+
+    def __init__(self, slot, generation, draw, width, height, pixel_ratio):
+        super().__init__()
+        self.slot = slot
+        self.generation = generation
+        self.draw = draw
+        self.width, self.height = width, height
+        self.pixel_ratio = pixel_ratio
+        self.signals = ChartSignals()
+
+    def run(self):
+        # Figure + FigureCanvasAgg directly: pyplot is not thread-safe.
+        # Sized in logical pixels, rendered at the screen's pixel ratio (HiDPI)
+        fig = Figure(figsize=(self.width / 100, self.height / 100), dpi=100 * self.pixel_ratio)
+        canvas = FigureCanvasAgg(fig)
+        self.draw(fig.add_subplot())
+        fig.tight_layout()
+        fig.subplots_adjust(bottom=0.25)
+        canvas.draw()
+        width, height = canvas.get_width_height()
+        image = QImage(canvas.buffer_rgba(), width, height, QImage.Format_RGBA8888).copy()
+        self.signals.rendered.emit(self.slot, self.generation, image)
+
+
 class RetentionApp(QWidget):
     def __init__(self):
         super().__init__()
@@ -49,11 +97,26 @@ class RetentionApp(QWidget):
         main_layout.addWidget(scroll)
 
         # ---------- Load data ----------
-        df = pd.read_excel("Documents/Mar24_Mar25_Cleansed.xlsx", sheet_name="Main")
-        df.rename(columns=lambda x: x.strip(), inplace=True)
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+        df = load_main()  # cached, with Date parsed and categorical columns
         df["Week"] = df["Date"].dt.isocalendar().week
         self.df = df
+        self.latest_date = df["Date"].max()
+
+        # Integer attendee codes and calendar months (year * 12 + month - 1, -1 for
+        # missing dates) so retention is counted on plain int arrays
+        self.codes, self.uniques = pd.factorize(df["Attendee ID"])
+        self.month_code = (df["Date"].dt.year * 12 + df["Date"].dt.month - 1).fillna(-1).to_numpy(np.int64)
+
+        # (prev counts, latest counts, eligible row mask); independent of the
+        # session threshold, so built on the first click and reused after
+        self._month_counts_cache = None
+
+        # Content hash of the last report written per session count
+        self._export_hashes = {}
+
+        # First attendance date of each row's attendee, computed once so the
+        # eligibility check on every click is a single vectorized comparison
+        self.min_date_per_id = df.groupby("Attendee ID", observed=True)["Date"].transform("min")
 
         # ---------- Buttons Row ----------
         button_row_widget = QWidget()
@@ -67,7 +130,8 @@ class RetentionApp(QWidget):
             vbox.setSpacing(2)
             num_btn = QPushButton(str(i))
             num_btn.setFixedSize(QSize(70, 35))
-            num_btn.clicked.connect(lambda _, count=i, b=num_btn: self.set_and_run(count, b))
+            num_btn.setProperty("count", i)
+            num_btn.clicked.connect(self.on_session_clicked)
             self.session_buttons.append(num_btn)
             vbox.addWidget(num_btn, alignment=Qt.AlignHCenter)
             excel_btn = QPushButton()
@@ -75,7 +139,8 @@ class RetentionApp(QWidget):
             excel_btn.setIconSize(QSize(20, 20))
             excel_btn.setFixedSize(QSize(26, 26))
             excel_btn.setStyleSheet("background: transparent; border: none;")
-            excel_btn.clicked.connect(lambda _, count=i: self.generate_excel(count))
+            excel_btn.setProperty("count", i)
+            excel_btn.clicked.connect(self.on_excel_clicked)
             vbox.addWidget(excel_btn, alignment=Qt.AlignHCenter)
             button_row_layout.addLayout(vbox)
 
@@ -121,60 +186,123 @@ class RetentionApp(QWidget):
                 label.set_ha('right')
 
         # 1. Gender by Activity Type
-        fig1, ax1 = plt.subplots(figsize=(10, 5))
-        data1 = df.groupby(["Activity type", "Gender"]).size().unstack(fill_value=0)
-        data1.plot(kind="bar", stacked=True, ax=ax1)
-        ax1.set_title("Gender Distribution by Activity Type")
-        ax1.set_xlabel("Activity Type")
-        ax1.set_ylabel("Number of Participants")
-        rotate_labels(ax1)
-        fig1.tight_layout()
-        fig1.subplots_adjust(bottom=0.25)
-        layout.addWidget(FigureCanvas(fig1))
+        def gender_by_activity(ax):
+            data1 = df.groupby(["Activity type", "Gender"], observed=True).size().unstack(fill_value=0)
+            data1.plot(kind="bar", stacked=True, ax=ax)
+            ax.set_title("Gender Distribution by Activity Type")
+            ax.set_xlabel("Activity Type")
+            ax.set_ylabel("Number of Participants")
+            rotate_labels(ax)
 
         # 2. Age by Activity
-        fig2, ax2 = plt.subplots(figsize=(10, 5))
-        df_age = df.dropna(subset=["RajiNewColumn-Age"]).copy()
-        df_age["Age Range"] = pd.cut(
-            df_age["RajiNewColumn-Age"],
-            bins=[0, 12, 17, 22, 30, 40, 100],
-            labels=["0–12", "13–17", "18–22", "23–30", "31–40", "40+"],
-        )
-        data2 = df_age.groupby(["Activity type", "Age Range"]).size().unstack(fill_value=0)
-        data2.plot(kind="bar", stacked=True, ax=ax2)
-        ax2.set_title("Age Distribution by Activity Type")
-        ax2.set_xlabel("Activity Type")
-        ax2.set_ylabel("Number of Participants")
-        rotate_labels(ax2)
-        fig2.tight_layout()
-        fig2.subplots_adjust(bottom=0.25)
-        layout.addWidget(FigureCanvas(fig2))
+        def age_by_activity(ax):
+            df_age = df.dropna(subset=["RajiNewColumn-Age"]).copy()
+            # Right-closed bins like pd.cut: (0, 12], (12, 17], ...; ages outside get code -1 (NaN)
+            bins = np.array([0, 12, 17, 22, 30, 40, 100])
+            labels = ["0–12", "13–17", "18–22", "23–30", "31–40", "40+"]
+            codes = np.searchsorted(bins, df_age["RajiNewColumn-Age"].to_numpy(), side="left") - 1
+            codes[(codes < 0) | (codes >= len(labels))] = -1
+            df_age["Age Range"] = pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+            data2 = df_age.groupby(["Activity type", "Age Range"], observed=True).size().unstack(fill_value=0)
+            data2.plot(kind="bar", stacked=True, ax=ax)
+            ax.set_title("Age Distribution by Activity Type")
+            ax.set_xlabel("Activity Type")
+            ax.set_ylabel("Number of Participants")
+            rotate_labels(ax)
 
         # 3. Activity Participation Volume
-        fig3, ax3 = plt.subplots(figsize=(10, 5))
-        df["Activity type"].value_counts().plot(kind="bar", ax=ax3, color="orange")
-        ax3.set_title("Activity Participation Volume")
-        ax3.set_xlabel("Activity Type")
-        ax3.set_ylabel("Count")
-        rotate_labels(ax3)
-        fig3.tight_layout()
-        fig3.subplots_adjust(bottom=0.25)
-        layout.addWidget(FigureCanvas(fig3))
+        def activity_volume(ax):
+            df["Activity type"].value_counts().plot(kind="bar", ax=ax, color="orange")
+            ax.set_title("Activity Participation Volume")
+            ax.set_xlabel("Activity Type")
+            ax.set_ylabel("Count")
+            rotate_labels(ax)
 
         # 4. Constituency by Activity Type
-        fig4, ax4 = plt.subplots(figsize=(10, 5))
-        data4 = df.groupby(["Activity type", "Constituency"]).size().unstack(fill_value=0)
-        top_cols = data4.sum().sort_values(ascending=False).head(8).index
-        data4[top_cols].plot(kind="bar", stacked=True, ax=ax4)
-        ax4.set_title("Top Constituencies by Activity Type")
-        ax4.set_xlabel("Activity Type")
-        ax4.set_ylabel("Number of Participants")
-        rotate_labels(ax4)
-        fig4.tight_layout()
-        fig4.subplots_adjust(bottom=0.25)
-        layout.addWidget(FigureCanvas(fig4))
+        def constituency_by_activity(ax):
+            data4 = df.groupby(["Activity type", "Constituency"], observed=True).size().unstack(fill_value=0)
+            top_cols = data4.sum().sort_values(ascending=False).head(8).index
+            data4[top_cols].plot(kind="bar", stacked=True, ax=ax)
+            ax.set_title("Top Constituencies by Activity Type")
+            ax.set_xlabel("Activity Type")
+            ax.set_ylabel("Number of Participants")
+            rotate_labels(ax)
+
+        # Charts are rendered in the background so the window shows immediately;
+        # one worker at a time since matplotlib shares font/text caches
+        self.chart_pool = QThreadPool(self)
+        self.chart_pool.setMaxThreadCount(1)
+        self.chart_draws = [gender_by_activity, age_by_activity, activity_volume, constituency_by_activity]
+        self.chart_labels = []
+        self.chart_jobs = {}  # (slot, generation) -> job, kept alive until its image arrives
+        self.chart_generation = 0
+        self.chart_render_size = None
+        for _ in self.chart_draws:
+            label = QLabel("Loading chart...")
+            label.setAlignment(Qt.AlignCenter)
+            # Width follows the window (not the pixmap), height stays at 500
+            label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Fixed)
+            label.setFixedHeight(500)
+            layout.addWidget(label)
+            self.chart_labels.append(label)
+
+        # Re-render at the new width once resizing settles
+        self.chart_resize_timer = QTimer(self)
+        self.chart_resize_timer.setSingleShot(True)
+        self.chart_resize_timer.setInterval(200)
+        self.chart_resize_timer.timeout.connect(self.render_charts)
+        self.render_charts()
+
+    def render_charts(self):
+        """Queue every chart at the labels' current width and the screen's pixel ratio."""
+        label = self.chart_labels[0]
+        width = label.width() if label.isVisible() else 1000
+        pixel_ratio = self.devicePixelRatioF()
+        if (width, pixel_ratio) == self.chart_render_size:
+            return
+        self.chart_render_size = (width, pixel_ratio)
+
+        # Drop queued renders for an older size; a running one is kept and ignored on arrival
+        for key, job in list(self.chart_jobs.items()):
+            if self.chart_pool.tryTake(job):
+                del self.chart_jobs[key]
+
+        self.chart_generation += 1
+        for slot, draw in enumerate(self.chart_draws):
+            job = ChartJob(slot, self.chart_generation, draw, width, label.height(), pixel_ratio)
+            job.setAutoDelete(False)
+            job.signals.rendered.connect(self.show_chart)
+            self.chart_jobs[(slot, self.chart_generation)] = job
+            self.chart_pool.start(job)
+
+    def show_chart(self, slot, generation, image):
+        self.chart_jobs.pop((slot, generation), None)
+        if generation != self.chart_generation:
+            return
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(self.chart_render_size[1])
+        self.chart_labels[slot].setPixmap(pixmap)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.chart_resize_timer.start()
+
+    def closeEvent(self, event):
+        # Drop charts not yet started and let a running one finish before the widgets go
+        self.chart_resize_timer.stop()
+        self.chart_pool.clear()
+        self.chart_pool.waitForDone()
+        super().closeEvent(event)
 
     # ---------- Retention & Utilities ----------
+    # Shared slots for the session/excel buttons; the count is stored on each button
+    def on_session_clicked(self):
+        btn = self.sender()
+        self.set_and_run(btn.property("count"), btn)
+
+    def on_excel_clicked(self):
+        self.generate_excel(self.sender().property("count"))
+
     def set_and_run(self, val, btn):
         for b in self.session_buttons:
             b.setStyleSheet("")
@@ -182,45 +310,43 @@ class RetentionApp(QWidget):
         self.selected_sessions = val
         self.calc_retention(val)
 
+    def month_counts(self):
+        """Per-attendee session counts for the last two months among eligible attendees."""
+        if self._month_counts_cache is None:
+            cutoff = self.latest_date - pd.DateOffset(months=2)
+            eligible = (self.min_date_per_id < cutoff).to_numpy() & (self.codes >= 0)
+
+            months = self.month_code[eligible]
+            latest = months.max() if months.size else -1
+            c_prev, c_last = retention_counts(self.codes[eligible], months, latest, latest - 1, len(self.uniques))
+            self._month_counts_cache = (c_prev, c_last, eligible)
+        return self._month_counts_cache
+
     def calc_retention(self, dynamic_sessions):
-        latest_date = self.df["Date"].max()
-        cutoff = latest_date - pd.DateOffset(months=2)
-        eligible = self.df.groupby("Attendee ID")["Date"].min()
-        eligible_ids = eligible[eligible < cutoff].index
-        df_eligible = self.df[self.df["Attendee ID"].isin(eligible_ids)].copy()
-        df_eligible["Month"] = df_eligible["Date"].dt.to_period("M")
-
-        month_counts = df_eligible.groupby(["Attendee ID", "Month"]).size().reset_index(name="count")
-        latest = month_counts["Month"].max()
-        prev = latest - 1
-        active_last_two = set(month_counts[month_counts["Month"].isin([prev, latest])]["Attendee ID"])
-        retained = set(
-            month_counts[(month_counts["Month"] == latest) & (month_counts["count"] >= dynamic_sessions)]["Attendee ID"]
-        ) & set(
-            month_counts[(month_counts["Month"] == prev) & (month_counts["count"] >= dynamic_sessions)]["Attendee ID"]
-        )
-        pct = round(len(retained) / len(active_last_two) * 100, 2) if len(active_last_two) > 0 else 0
+        c_prev, c_last, eligible = self.month_counts()
+        # Boolean masks over attendee codes; counts are plain sums
+        active_count = int(((c_prev > 0) | (c_last > 0)).sum())
+        retained = (c_prev >= dynamic_sessions) & (c_last >= dynamic_sessions)
+        retained_count = int(retained.sum())
+        pct = round(retained_count / active_count * 100, 2) if active_count > 0 else 0
         self.result_label.setText(
-            f"{len(retained)} out of {len(active_last_two)} participants in the last two months "
+            f"{retained_count} out of {active_count} participants in the last two months "
             f"had ≥{dynamic_sessions} sessions ({pct}%)."
         )
         self.last_retained = retained
-        self.last_df_eligible = df_eligible
+        self.last_eligible = eligible
 
     def generate_excel(self, dynamic_sessions):
         # Recalculate retention for the chosen session threshold
         self.calc_retention(dynamic_sessions)
-        retained = getattr(self, "last_retained", set())
-        df_eligible = getattr(self, "last_df_eligible", self.df)
+        # Rows of eligible attendees that met the threshold (eligible rows all have a code)
+        rows = self.last_eligible & self.last_retained[self.codes]
 
         # Prepare export folder
         folder = "Retention Excels"
         os.makedirs(folder, exist_ok=True)
         export_file = os.path.join(folder, f"retention_report_{dynamic_sessions}.xlsx")
 
-        # Filter retained participants
-        df_retained = df_eligible[df_eligible["Attendee ID"].isin(retained)]
-
         # Select relevant columns
         export_cols = [
             "Attendee ID",
@@ -229,14 +355,16 @@ class RetentionApp(QWidget):
             "Date",
             "Activity type"
         ]
-        available_cols = [c for c in export_cols if c in df_retained.columns]
-        df_export = df_retained[available_cols].copy()
+        available_cols = [c for c in export_cols if c in self.df.columns]
 
-        # Optional: sort by Attendee ID and Date
-        df_export.sort_values(by=["Attendee ID", "Date"], inplace=True)
+        # Rows are selected by mask, so only the exported rows and columns are copied
+        df_export = self.df.loc[rows, available_cols].sort_values(by=["Attendee ID", "Date"])
 
-        # Export to Excel
-        df_export.to_excel(export_file, index=False)
+        # Export to Excel, unless an identical report is already on disk
+        export_hash = pd.util.hash_pandas_object(df_export, index=False).to_numpy().tobytes()
+        if not (os.path.exists(export_file) and self._export_hashes.get(dynamic_sessions) == export_hash):
+            df_export.to_excel(export_file, index=False)
+            self._export_hashes[dynamic_sessions] = export_hash
 
         # Auto-open file
         if sys.platform == "win32":
@@ -1,5 +1,6 @@
 
 import sys
+import numpy as np
 import pandas as pd
 from PyQt5.QtCore import QSize
 from PyQt5.QtWidgets import (
@@ -19,12 +20,11 @@ class RetentionChart(FigureCanvas):
         self.ax.set_title("All Activity Types - Participants by Gender")
         data = df.groupby(["Activity type", "Gender"]).size().unstack(fill_value=0)
         activity_types = list(data.index)
-        x = range(len(activity_types))
-        bottom = [0] * len(activity_types)
-        for gender in data.columns:
-            counts = data[gender].tolist()
-            self.ax.bar(x, counts, label=gender, bottom=bottom)
-            bottom = [sum(x) for x in zip(bottom, counts)]
+        x = np.arange(len(activity_types))
+        arr = data.to_numpy(np.int64)
+        bottom = np.cumsum(arr, axis=1) - arr  # stack offsets for every gender column
+        for g, gender in enumerate(data.columns):
+            self.ax.bar(x, arr[:, g], label=gender, bottom=bottom[:, g])
         self.ax.set_xticks(x)
         self.ax.set_xticklabels(activity_types, rotation=15)
         self.ax.set_ylabel("Number of Participants")
@@ -43,7 +43,24 @@ class RetentionApp(QWidget):
         df.rename(columns=lambda x: x.strip(), inplace=True)
         df["Date"] = pd.to_datetime(df["Date"])
         df["Week"] = df["Date"].dt.isocalendar().week
+        df["Month"] = df["Date"].dt.year * 12 + df["Date"].dt.month - 1  # int month key, as in retention-trend.py; key - 1 is the previous month
         self.df = df
+        self.latest_date = df["Date"].max()
+
+        # Each row's attendee first date, for the eligibility checks
+        self.min_date_per_id = df.groupby("Attendee ID")["Date"].transform("min")
+        # Integer attendee codes for membership tests (no per-click ID hashing)
+        self.codes, self.uniques = pd.factorize(df["Attendee ID"])
+
+        # Sessions per eligible attendee per month (one column per month); the
+        # groupby does not depend on the session threshold, so it is built once
+        cutoff = self.latest_date - pd.DateOffset(months=2)
+        df_eligible = df[self.min_date_per_id < cutoff]
+        self.eligible_count = df_eligible["Attendee ID"].nunique()
+        self.month_counts = (
+            df_eligible.groupby(["Attendee ID", "Month"]).size()
+            .unstack(fill_value=0).astype("int32")
+        )
 
         self.layout.addWidget(QLabel("Select session count for retention calculation (monthly):"))
         button_row = QHBoxLayout()
@@ -81,39 +98,31 @@ class RetentionApp(QWidget):
         self.calc_retention(val)
 
     def calc_retention(self, dynamic_sessions):
-        latest_date = self.df["Date"].max()
-        cutoff = latest_date - pd.DateOffset(months=2)
-
-        eligible = self.df.groupby("Attendee ID")["Date"].min()
-        eligible_ids = eligible[eligible < cutoff].index
-        df_eligible = self.df[self.df["Attendee ID"].isin(eligible_ids)].copy()
-        df_eligible["Month"] = df_eligible["Date"].dt.to_period("M")
-
-        month_counts = df_eligible.groupby(["Attendee ID", "Month"]).size().reset_index(name="count")
-        latest = month_counts["Month"].max()
-        prev = latest - 1
-
-        retained = set(
-            month_counts[(month_counts["Month"] == latest) & (month_counts["count"] >= dynamic_sessions)]["Attendee ID"]
-        ) & set(
-            month_counts[(month_counts["Month"] == prev) & (month_counts["count"] >= dynamic_sessions)]["Attendee ID"]
-        )
-
-        pct = round(len(retained) / len(eligible_ids) * 100, 2) if len(eligible_ids) > 0 else 0
+        month_counts = self.month_counts
+        eligible_count = self.eligible_count
+
+        retained_count = 0
+        if len(month_counts.columns):
+            latest = month_counts.columns[-1]
+            prev = latest - 1
+            if prev in month_counts.columns:
+                # Attendee x month matrix; retention is one vectorized compare of two columns
+                counts = month_counts.to_numpy()
+                prev_col = month_counts.columns.get_loc(prev)
+                retained_count = int(((counts[:, prev_col] >= dynamic_sessions) & (counts[:, -1] >= dynamic_sessions)).sum())
+
+        pct = round(retained_count / eligible_count * 100, 2) if eligible_count > 0 else 0
         self.result_label.setText(
-            f"<b>{len(retained)}</b> out of <b>{len(eligible_ids)}</b> eligible participants "
+            f"<b>{retained_count}</b> out of <b>{eligible_count}</b> eligible participants "
             f"had ≥<b>{dynamic_sessions}</b> sessions in the last two months "
             f"(<b>{pct}%</b>)."
         )
 
     def weekly_activity(self, category):
-        latest_date = self.df["Date"].max()
-        cutoff = latest_date - pd.DateOffset(months=3)
-        eligible = self.df.groupby("Attendee ID")["Date"].min()
-        eligible_ids = eligible[eligible < cutoff].index
-        df_eligible = self.df[self.df["Attendee ID"].isin(eligible_ids)]
+        cutoff = self.latest_date - pd.DateOffset(months=3)
+        eligible = (self.min_date_per_id < cutoff).to_numpy()
+        df_eligible = self.df[eligible]
 
-        df_eligible["Week"] = df_eligible["Date"].dt.isocalendar().week
         weekly_counts = df_eligible.groupby(["Attendee ID", "Week"]).size().reset_index(name="Weekly Count")
         avg_week = weekly_counts.groupby("Attendee ID")["Weekly Count"].mean().reset_index()
 
@@ -125,7 +134,10 @@ class RetentionApp(QWidget):
 
         lo, hi = label_map[category]
         selected_ids = avg_week[(avg_week["Weekly Count"] > lo) & (avg_week["Weekly Count"] <= hi)]["Attendee ID"]
-        df_selected = df_eligible[df_eligible["Attendee ID"].isin(selected_ids)]
+        # Lookup table indexed by attendee code: one gather instead of a hash lookup per row
+        selected = np.zeros(len(self.uniques), dtype=bool)
+        selected[self.uniques.get_indexer(selected_ids)] = True
+        df_selected = df_eligible[selected[self.codes[eligible]]]
 
         top_activities = df_selected["Activity type"].value_counts().nlargest(2).index.tolist()
         act_text = " and ".join(top_activities)
@@ -7,14 +7,21 @@
 import matplotlib
 matplotlib.use("TkAgg")  # ✅ ensures windows stay interactive
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+from io_utils import load_main
 
 plt.ion()  # ✅ interactive mode so multiple charts stay open
 
 
+def month_periods(months):
+    """Monthly PeriodIndex for year * 12 + (month - 1) ints."""
+    return pd.PeriodIndex.from_ordinals(np.asarray(months) - 1970 * 12, freq="M")
+
+
 def run_retention_trend():
     FILE_PATH = "Documents/Mar24_Mar25_Cleansed.xlsx"
     SHEET = "Main"
@@ -26,26 +33,38 @@ def run_retention_trend():
     # ----------------------------------------------------
     # 1. Load and Prepare Data
     # ----------------------------------------------------
-    df = pd.read_excel(FILE_PATH, sheet_name=SHEET)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = load_main(FILE_PATH, SHEET)  # Date is already parsed by the loader
     df = df.dropna(subset=["Date", "Attendee ID"])
     df = df.drop_duplicates(subset=["Attendee ID", "Date"])  # one record per day per attendee
 
-    # Month-based fields
-    df["Month"] = df["Date"].dt.to_period("M")
-    df["JoinMonth"] = df.groupby("Attendee ID")["Date"].transform("min").dt.to_period("M")
-    df["MonthOffset"] = (df["Month"] - df["JoinMonth"]).apply(lambda x: x.n)
+    # Month-based fields as year * 12 + month - 1 ints: plain int keys for the
+    # groupbys below, turned into Period labels only for what gets shown
+    first_date = df.groupby("Attendee ID", observed=True)["Date"].transform("min")
+    df["Month"] = (df["Date"].dt.year * 12 + df["Date"].dt.month - 1).astype("int32")
+    df["JoinMonth"] = (first_date.dt.year * 12 + first_date.dt.month - 1).astype("int32")
+    df["MonthOffset"] = df["Month"] - df["JoinMonth"]  # months since joining
 
     # ----------------------------------------------------
     # 2. Cohort Retention Table
     # ----------------------------------------------------
-    cohort = (
-        df.groupby(["JoinMonth", "MonthOffset"])["Attendee ID"]
-        .nunique()
-        .reset_index()
+    # Distinct (cohort, offset, attendee) triples counted straight into the
+    # cohort x offset grid; cells with no attendees stay empty (NaN)
+    join_idx, join_months = pd.factorize(df["JoinMonth"], sort=True)
+    id_codes, ids = pd.factorize(df["Attendee ID"])
+    offsets = df["MonthOffset"].to_numpy(np.int64)
+    n_offsets, n_ids = offsets.max() + 1, len(ids)
+
+    cells = np.unique((join_idx * n_offsets + offsets) * n_ids + id_codes) // n_ids
+    counts = np.bincount(cells, minlength=len(join_months) * n_offsets).reshape(len(join_months), n_offsets)
+    present = np.flatnonzero(counts.any(axis=0))
+
+    counts = counts[:, present]
+
+    cohort_pivot = pd.DataFrame(
+        np.where(counts > 0, counts, np.nan),
+        index=month_periods(join_months).rename("JoinMonth"),
+        columns=pd.Index(present, name="MonthOffset"),
     )
-
-    cohort_pivot = cohort.pivot(index="JoinMonth", columns="MonthOffset", values="Attendee ID")
     cohort_size = cohort_pivot[0]
     retention = cohort_pivot.divide(cohort_size, axis=0) * 100
 
@@ -76,12 +95,15 @@ def run_retention_trend():
         .sort_values("Month")
     )
 
-    # Calculate churn rate (month-over-month)
-    overall["PrevMonth"] = overall["ActiveParticipants"].shift(1)
-    overall["ChurnRate"] = (1 - (overall["ActiveParticipants"] / overall["PrevMonth"])) * 100
-    overall["ChurnRate"] = overall["ChurnRate"].fillna(0).clip(lower=0)
+    # Calculate churn rate (month-over-month); the first month has no previous month
+    active_counts = overall["ActiveParticipants"].to_numpy(np.float64)
+    churn = np.zeros_like(active_counts)
+    np.subtract(1.0, active_counts[1:] / active_counts[:-1], out=churn[1:])
+    churn *= 100
+    np.clip(churn, 0, None, out=churn)
+    overall["ChurnRate"] = churn
 
-    overall["MonthLabel"] = overall["Month"].dt.strftime("%b %Y")
+    overall["MonthLabel"] = month_periods(overall["Month"]).strftime("%b %Y")
 
     # Plot churn only
     plt.figure(figsize=(10, 5))
@@ -106,31 +128,27 @@ def run_retention_trend():
     # ----------------------------------------------------
     # 5. Rolling Retention of New Joiners
     # ----------------------------------------------------
-    month_groups = df.groupby("Month")["Attendee ID"].apply(set).sort_index()
-    months = list(month_groups.index)
-    results = []
-
-    for i in range(1, len(months)):
-        prev_all = month_groups[months[i - 1]]
-        earlier = set().union(*month_groups.iloc[: i - 1]) if i > 1 else set()
-        prev_joiners_only = prev_all - earlier
-
-        curr_set = month_groups[months[i]]
-        retained = prev_joiners_only & curr_set
-        prev_total = len(prev_joiners_only)
-
-        retention_rate = (len(retained) / prev_total) * 100 if prev_total > 0 else 0.0
-        dropout_rate = 100 - retention_rate
-
-        results.append({
-            "Month": str(months[i]),
-            "Retention%": round(retention_rate, 2),
-            "Dropout%": round(dropout_rate, 2),
-            "PrevMonthNewJoiners": prev_total,
-            "RetainedFromPrevJoiners": len(retained),
-        })
-
-    trend = pd.DataFrame(results)
+    # A month's new joiners are the attendees whose JoinMonth is that month, so
+    # the running "seen before" set reduces to comparing month positions
+    active = df.drop_duplicates(subset=["Attendee ID", "Month"])
+    month_idx, months = pd.factorize(active["Month"], sort=True)
+    join_idx = months.get_indexer(active["JoinMonth"])
+
+    n_months = len(months)
+    new_joiners = np.bincount(month_idx[join_idx == month_idx], minlength=n_months)
+    back_next_month = np.bincount(month_idx[join_idx == month_idx - 1], minlength=n_months)
+
+    prev_total = new_joiners[:-1]
+    retained = back_next_month[1:]
+    retention_rate = np.divide(retained * 100.0, prev_total, out=np.zeros(len(retained)), where=prev_total > 0)
+
+    trend = pd.DataFrame({
+        "Month": month_periods(months[1:]).astype(str),
+        "Retention%": retention_rate.round(2),
+        "Dropout%": (100 - retention_rate).round(2),
+        "PrevMonthNewJoiners": prev_total,
+        "RetainedFromPrevJoiners": retained,
+    })
 
     plt.figure(figsize=(10, 5))
     plt.plot(trend["Month"], trend["Retention%"], color="green", marker="o", label="Retention %")
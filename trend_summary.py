@@ -9,13 +9,26 @@
 # -------------------------------------------------------
 
 import pandas as pd
+import numpy as np
 import os
 from datetime import timedelta
+from io_utils import load_main
+
+
+def most_common(s):
+    """Most frequent value of a categorical Series, ties going to the first category like mode()."""
+    codes = s.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    if not codes.size:
+        return "N/A"
+    return s.cat.categories[np.bincount(codes).argmax()]
 
 
 def generate_trend_summary():
     FILE_PATH = "Documents/Mar24_Mar25_Cleansed.xlsx"
     SHEET = "Main"
+    COLUMNS = ["Date", "Attendee ID", "Gender", "Activity type", "RajiNewColumn-Range",
+               "Constituency", "Ward", "IMD rank"]
 
     if not os.path.exists(FILE_PATH):
         return f"❌ File not found:\n{FILE_PATH}"
@@ -23,14 +36,26 @@ def generate_trend_summary():
     # ---------------------------
     # Load and clean
     # ---------------------------
-    df = pd.read_excel(FILE_PATH, sheet_name=SHEET)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = load_main(FILE_PATH, SHEET, columns=COLUMNS)  # only the columns used below; Date is already parsed
     df = df.dropna(subset=["Date"])
 
+    # Strip and filter each text column on its categories, not per row: one
+    # shared row mask, and the cleaned columns stay categorical for the groupbys
+    bad = ["", "nan", "None", "Not provided", "Not Provided"]
+    keep = np.ones(len(df), dtype=bool)
+    cleaned = {}
     for col in ["Gender", "Activity type", "RajiNewColumn-Range", "Constituency", "Ward"]:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
-            df = df[~df[col].isin(["", "nan", "None", "Not provided", "Not Provided"])]
+            values = df[col].astype("category")
+            labels = values.cat.categories.astype(str).str.strip()
+            label_codes, new_labels = pd.factorize(labels, sort=True)  # stripping can merge labels
+            codes = values.cat.codes.to_numpy()
+            keep &= (codes >= 0) & ~np.isin(labels, bad)[codes]
+            cleaned[col] = (label_codes[codes], new_labels)
+
+    df = df[keep].copy()
+    for col, (codes, labels) in cleaned.items():
+        df[col] = pd.Categorical.from_codes(codes[keep], categories=labels).remove_unused_categories()
 
     latest_date = df["Date"].max().normalize()
     start_date = latest_date - timedelta(days=60)
@@ -40,11 +65,12 @@ def generate_trend_summary():
     df_first30 = df_window[df_window["Date"] < mid_date]
     df_last30 = df_window[df_window["Date"] >= mid_date]
 
-    summary_text = (
+    # Report pieces are collected in a list and joined once at the end
+    parts = [(
         f"📆 Participation Comparison (Last 60 Days Window)\n"
         f"Period: {start_date.date()} → {latest_date.date()}\n"
         + "-" * 65 + "\n\n"
-    )
+    )]
 
     # ---------------------------
     # Helper Function
@@ -52,32 +78,45 @@ def generate_trend_summary():
     def compare_categories(df_first, df_last, col, label,
                            show_top=False, show_all=False,
                            top_n=2, wording="Participation in {}"):
-        prev_counts = df_first.groupby(col)["Attendee ID"].nunique()
-        last_counts = df_last.groupby(col)["Attendee ID"].nunique()
-
-        cats = sorted(set(prev_counts.index) | set(last_counts.index))
-        changes = []
-        for c in cats:
-            prev_val = prev_counts.get(c, 0)
-            last_val = last_counts.get(c, 0)
-            if prev_val == 0 and last_val == 0:
-                continue
-            pct_change = (
-                ((last_val - prev_val) / prev_val * 100)
-                if prev_val > 0
-                else (100.0 if last_val > 0 else 0.0)
-            )
-            abs_change = abs(last_val - prev_val)
-            changes.append((c, prev_val, last_val, abs_change, pct_change))
+        # Unique attendees per category in each period: factorize both periods
+        # together, keep the distinct (category, attendee) pairs and count them
+        col_codes, cats = pd.factorize(pd.concat([df_first[col], df_last[col]], ignore_index=True), sort=True)
+        id_codes, ids = pd.factorize(pd.concat([df_first["Attendee ID"], df_last["Attendee ID"]], ignore_index=True))
+        n_cats, n_ids = len(cats), len(ids)
+        in_last = np.arange(len(col_codes)) >= len(df_first)
+        valid = (col_codes >= 0) & (id_codes >= 0)
+
+        def nunique_per_category(rows):
+            pairs = np.unique(col_codes[rows].astype(np.int64) * n_ids + id_codes[rows])
+            return np.bincount(pairs // n_ids, minlength=n_cats)
+
+        prev_counts = nunique_per_category(valid & ~in_last)
+        last_counts = nunique_per_category(valid & in_last)
+
+        seen = (prev_counts > 0) | (last_counts > 0)
+        ratio = np.divide(last_counts - prev_counts, prev_counts,
+                          out=np.zeros(n_cats), where=prev_counts > 0)
+        pct_changes = np.where(prev_counts > 0, ratio * 100, np.where(last_counts > 0, 100.0, 0.0))
+        cats, prev_counts, last_counts, pct_changes = (
+            cats[seen], prev_counts[seen], last_counts[seen], pct_changes[seen]
+        )
+        abs_changes = np.abs(last_counts - prev_counts)
 
-        if not changes:
+        if not len(cats):
             return f"No valid data for {label}.\n"
 
+        # Only the rows that get reported are turned into Python tuples; cats
+        # are already sorted, and ties in the top-N keep that order
+        if show_top == "absolute":
+            rows = np.argsort(-abs_changes, kind="stable")[:top_n]
+        else:
+            rows = range(len(cats))
+        changes = [(cats[i], prev_counts[i], last_counts[i], abs_changes[i], pct_changes[i]) for i in rows]
+
         lines = [f"{label} Highlights (First 30 days → Last 30 days):"]
 
         if show_top == "absolute":
-            top_shift = sorted(changes, key=lambda x: x[3], reverse=True)[:top_n]
-            for c, prev_val, last_val, abs_change, pct_change in top_shift:
+            for c, prev_val, last_val, abs_change, pct_change in changes:
                 direction = "increased" if last_val > prev_val else "decreased"
                 lines.append(
                     f"• {c} participation {direction} by {abs_change} "
@@ -85,7 +124,7 @@ def generate_trend_summary():
                 )
 
         elif show_all:
-            for c, prev_val, last_val, abs_change, pct_change in sorted(changes, key=lambda x: x[0]):
+            for c, prev_val, last_val, abs_change, pct_change in changes:
                 if abs(pct_change) < 1:
                     lines.append(f"• {wording.format(c)} remained steady ({prev_val} → {last_val})")
                 elif pct_change > 0:
@@ -109,122 +148,126 @@ def generate_trend_summary():
     # Gender Trend
     # ---------------------------
     if "Gender" in df.columns:
-        summary_text += compare_categories(
+        parts.append(compare_categories(
             df_first30, df_last30, "Gender", "Gender"
-        ) + "\n"
+        ) + "\n")
 
     # ---------------------------
     # Activity Trend
     # ---------------------------
     if "Activity type" in df.columns:
-        summary_text += compare_categories(
+        parts.append(compare_categories(
             df_first30, df_last30, "Activity type", "Activity",
             show_all=True, wording="Participation in {} Activity"
-        ) + "\n"
+        ) + "\n")
 
     # ---------------------------
     # Age Bucket Trend
     # ---------------------------
     if "RajiNewColumn-Range" in df.columns:
-        summary_text += compare_categories(
+        parts.append(compare_categories(
             df_first30, df_last30, "RajiNewColumn-Range", "Age Bucket",
             show_all=True, wording="Participation among {} age group"
-        ) + "\n"
+        ) + "\n")
 
     # ---------------------------
     # Constituency Trend (Top 5)
     # ---------------------------
     if "Constituency" in df.columns:
-        summary_text += compare_categories(
+        parts.append(compare_categories(
             df_first30, df_last30, "Constituency", "Constituency",
             show_top="absolute", top_n=5
-        ) + "\n"
+        ) + "\n")
 
     # ---------------------------
     # IMD Dropout Trend + Characteristics
     # ---------------------------
     if {"IMD rank", "Ward", "Attendee ID"}.issubset(df.columns):
-        first_ids = set(df_first30["Attendee ID"].unique())
-        last_ids = set(df_last30["Attendee ID"].unique())
-        dropout_ids = first_ids - last_ids
-        dropout_df = df_first30[df_first30["Attendee ID"].isin(dropout_ids)]
+        # Attendees seen in the first 30 days but not the last, by category code
+        first_codes = df_first30["Attendee ID"].cat.codes.to_numpy()
+        last_codes = df_last30["Attendee ID"].cat.codes.to_numpy()
+        in_last = np.zeros(len(df["Attendee ID"].cat.categories), dtype=bool)
+        in_last[last_codes[last_codes >= 0]] = True
+        dropout_df = df_first30[(first_codes >= 0) & ~in_last[first_codes]]
 
         if not dropout_df.empty:
+            # Top 3 groups without sorting every (IMD rank, Ward) group
             imd_ward_counts = (
-                dropout_df.groupby(["IMD rank", "Ward"])["Attendee ID"]
+                dropout_df.groupby(["IMD rank", "Ward"], observed=True)["Attendee ID"]
                 .nunique()
-                .reset_index(name="Dropouts")
-                .sort_values(by="Dropouts", ascending=False)
-                .head(3)
+                .nlargest(3)
             )
 
-            summary_text += "IMD Dropout Highlights (Top 3 by dropout count):\n"
-            for _, row in imd_ward_counts.iterrows():
-                summary_text += (
-                    f"• Ward: {row['Ward']} | IMD rank: {row['IMD rank']} "
-                    f"→ {int(row['Dropouts'])} dropouts\n"
+            parts.append("IMD Dropout Highlights (Top 3 by dropout count):\n")
+            for (imd_rank, ward), dropouts in imd_ward_counts.items():
+                parts.append(
+                    f"• Ward: {ward} | IMD rank: {imd_rank} "
+                    f"→ {int(dropouts)} dropouts\n"
                 )
 
             # --- Dropout characteristics ---
-            gender_top = dropout_df["Gender"].mode()[0] if "Gender" in dropout_df.columns and not dropout_df["Gender"].dropna().empty else "N/A"
-            age_top = dropout_df["RajiNewColumn-Range"].mode()[0] if "RajiNewColumn-Range" in dropout_df.columns and not dropout_df["RajiNewColumn-Range"].dropna().empty else "N/A"
-            const_top = dropout_df["Constituency"].mode()[0] if "Constituency" in dropout_df.columns and not dropout_df["Constituency"].dropna().empty else "N/A"
+            gender_top = most_common(dropout_df["Gender"]) if "Gender" in dropout_df.columns else "N/A"
+            age_top = most_common(dropout_df["RajiNewColumn-Range"]) if "RajiNewColumn-Range" in dropout_df.columns else "N/A"
+            const_top = most_common(dropout_df["Constituency"]) if "Constituency" in dropout_df.columns else "N/A"
 
-            summary_text += (
+            parts.append(
                 "\n📊 Dropout Characteristics Summary:\n"
                 f"• Most common gender among dropouts: {gender_top}\n"
                 f"• Most common age range among dropouts: {age_top}\n"
                 f"• Top constituency with highest dropouts: {const_top}\n\n"
             )
         else:
-            summary_text += "No IMD dropout data found in the current window.\n\n"
+            parts.append("No IMD dropout data found in the current window.\n\n")
 
     # ---------------------------
     # Weekday Attendance Weightage
     # ---------------------------
     if {"Date", "Attendee ID"}.issubset(df.columns):
-        df["Weekday"] = df["Date"].dt.day_name()
-        unique_attendance = df.groupby(["Date", "Attendee ID"]).size().reset_index(name="Sessions")
-        unique_attendance = unique_attendance.drop_duplicates(subset=["Date", "Attendee ID"])
-        weekday_counts = unique_attendance["Date"].dt.day_name().value_counts(normalize=True) * 100
-        weekday_counts = weekday_counts.reindex(
-            ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        ).fillna(0)
+        # One attendance per attendee per day, counted by day-of-week number
+        unique_attendance = df.dropna(subset=["Attendee ID"]).drop_duplicates(subset=["Date", "Attendee ID"])
+        dow = unique_attendance["Date"].dt.dayofweek.to_numpy()
+        day_counts = np.bincount(dow, minlength=7).astype(np.float64)
+        if day_counts.sum() > 0:
+            day_counts = day_counts / day_counts.sum() * 100
+        weekday_counts = zip(
+            ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"], day_counts
+        )
 
-        summary_text += "📅 Attendance Weightage by Weekday:\n"
-        for day, pct in weekday_counts.items():
-            summary_text += f"• {day}: {pct:.1f}% of total unique attendances\n"
+        parts.append("📅 Attendance Weightage by Weekday:\n")
+        for day, pct in weekday_counts:
+            parts.append(f"• {day}: {pct:.1f}% of total unique attendances\n")
 
     # ---------------------------
     # Drop-off Duration Summary (corrected 3 & 6 months)
     # ---------------------------
     if {"Date", "Attendee ID"}.issubset(df.columns):
-        attendance = df.groupby("Attendee ID")["Date"].agg(["min", "max"]).reset_index()
-        attendance.rename(columns={"min": "FirstSession", "max": "LastSession"}, inplace=True)
-        attendance["MonthsActive"] = (attendance["LastSession"] - attendance["FirstSession"]) / pd.Timedelta(days=30)
+        attendance = df.groupby("Attendee ID", observed=True)["Date"].agg(["min", "max"])
+        first_session = attendance["min"].to_numpy()
+        months_active = (attendance["max"].to_numpy() - first_session) / np.timedelta64(30, "D")
 
         latest_date = df["Date"].max()
         cutoff_3 = latest_date - pd.DateOffset(months=3)
         cutoff_6 = latest_date - pd.DateOffset(months=6)
 
-        valid_3 = attendance[attendance["FirstSession"] <= cutoff_3]
-        valid_6 = attendance[attendance["FirstSession"] <= cutoff_6]
+        # Plain datetime64 / float masks, no intermediate frames
+        valid_3 = first_session <= cutoff_3.to_datetime64()
+        valid_6 = first_session <= cutoff_6.to_datetime64()
 
-        total3 = len(valid_3)
-        total6 = len(valid_6)
-        drop3 = len(valid_3[valid_3["MonthsActive"] <= 3])
-        drop6 = len(valid_6[valid_6["MonthsActive"] <= 6])
+        total3 = int(valid_3.sum())
+        total6 = int(valid_6.sum())
+        drop3 = int((valid_3 & (months_active <= 3)).sum())
+        drop6 = int((valid_6 & (months_active <= 6)).sum())
 
         pct3 = round(drop3 / total3 * 100, 2) if total3 > 0 else 0
         pct6 = round(drop6 / total6 * 100, 2) if total6 > 0 else 0
 
-        summary_text += (
+        parts.append(
             "\n⏳ Drop-off Duration Summary (adjusted for recent joiners):\n"
             f"• {pct3}% of eligible members did not attend any session after 3 months from their joining date.\n"
             f"• {pct6}% of eligible members did not attend any session after 6 months from their joining date.\n"
         )
 
-    return summary_text.strip()
+    return "".join(parts).strip()
 
 
 # Standalone run
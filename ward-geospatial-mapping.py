@@ -1,7 +1,9 @@
 import os
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import folium
+from folium.plugins import FastMarkerCluster
 import webbrowser
 
 # -----------------------------
@@ -11,6 +13,19 @@ file_path = "Mar24_Mar25.xlsx"         # Input Excel
 geojson_file = "Ward_UK.geojson"       # ONS Wards GeoJSON (Dec 2024 UK BGC)
 output_file = "Documents/Ward_Info.xlsx"  # Output Excel
 
+# Above this many wards (e.g. a national map) markers are clustered client-side
+MARKER_CLUSTER_THRESHOLD = 2000
+# Builds the same circle marker in the browser from [lat, lon, color, radius, popup]
+CLUSTER_MARKER_JS = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: row[3], color: row[2], fill: true, fillColor: row[2], fillOpacity: 0.85
+    });
+    marker.bindPopup(row[4]);
+    return marker;
+}
+"""
+
 # -----------------------------
 # 2. Read Excel input (must have Ward & District)
 # -----------------------------
@@ -21,78 +36,79 @@ missing = required_cols - set(df.columns)
 if missing:
     raise ValueError(f"Missing required columns in Excel: {missing}")
 
-# Group by Ward + District and count unique attendees (if exists)
+# Group by Ward + District and count unique attendees (if exists);
+# as categoricals the group keys are hashed once, observed=True keeps only real pairs
+df[["Ward", "District"]] = df[["Ward", "District"]].astype("category")
 count_col = "Attendee ID" if "Attendee ID" in df.columns else None
 if count_col:
     ward_counts = (
-        df.groupby(["Ward", "District"])[count_col]
+        df.groupby(["Ward", "District"], observed=True)[count_col]
           .nunique()
           .reset_index(name="count")
           .sort_values(by="count", ascending=False)
     )
 else:
     ward_counts = (
-        df.groupby(["Ward", "District"])
+        df.groupby(["Ward", "District"], observed=True)
           .size()
           .reset_index(name="count")
           .sort_values(by="count", ascending=False)
     )
 
-# Save base data
-with pd.ExcelWriter(output_file, engine="openpyxl", mode="w") as writer:
-    ward_counts.to_excel(writer, sheet_name="Ward", index=False)
-print("✅ Ward + District counts written to Ward_Info.xlsx")
-
 # -----------------------------
 # 3. Merge with GeoJSON
 # -----------------------------
 if not os.path.exists(geojson_file):
+    # Still save the base counts before stopping
+    with pd.ExcelWriter(output_file, engine="openpyxl", mode="w") as writer:
+        ward_counts.to_excel(writer, sheet_name="Ward", index=False)
+    print("✅ Ward + District counts written to Ward_Info.xlsx")
     raise FileNotFoundError("⚠️ GeoJSON file not found. Please download 'Ward_UK.geojson' and place it in the folder.")
 
 gdf = gpd.read_file(geojson_file)
-merged_rows = []
-
-for _, row in ward_counts.iterrows():
-    ward_name = str(row["Ward"]).strip()
-    district_name = str(row["District"]).strip()
-    match_row = None
-
-    # Exact match on Ward + District
-    matches = gdf[
-        (gdf["WD24NM"].str.lower() == ward_name.lower()) &
-        (gdf["LAD24NM"].str.lower() == district_name.lower())
-    ]
 
-    # Fuzzy handling for "St."/"Saint"
-    if matches.empty:
-        cleaned = (
-            ward_name.replace("St.", "Saint")
+# Lower-cased join keys on both sides; the first polygon per (ward, district) wins
+ward_names = ward_counts["Ward"].astype(str).str.strip().to_numpy()
+district_names = ward_counts["District"].astype(str).str.strip().to_numpy()
+ward_keys = pd.DataFrame({"wd": pd.Series(ward_names).str.lower(), "lad": pd.Series(district_names).str.lower()})
+gdf_keys = pd.DataFrame({
+    "wd": gdf["WD24NM"].str.lower(),
+    "lad": gdf["LAD24NM"].str.lower(),
+    "pos": np.arange(len(gdf)),
+}).dropna().drop_duplicates(subset=["wd", "lad"])
+
+# Exact match on Ward + District: one hash join, NaN where nothing matched
+match_pos = ward_keys.merge(gdf_keys, on=["wd", "lad"], how="left")["pos"].to_numpy()
+
+# Fuzzy handling for "St."/"Saint" for the unmatched wards, within the same district only
+wd_lower = gdf["WD24NM"].fillna("").str.lower().to_numpy(dtype=str)
+district_rows = pd.Series(np.arange(len(gdf))).groupby(gdf["LAD24NM"].str.lower().to_numpy()).indices
+for i in np.flatnonzero(np.isnan(match_pos)):
+    cleaned = (
+        ward_names[i].replace("St.", "Saint")
                      .replace("St ", "Saint ")
                      .strip()
-        )
-        matches = gdf[
-            (gdf["WD24NM"].str.contains(cleaned, case=False, na=False)) &
-            (gdf["LAD24NM"].str.lower() == district_name.lower())
-        ]
-
-    if not matches.empty:
-        match_row = matches.iloc[0]
-
-    if match_row is not None:
-        merged_rows.append({
-            "Ward": ward_name,
-            "District": district_name,
-            "count": row["count"],
-            "latitude": match_row.get("LAT"),
-            "longitude": match_row.get("LONG"),
-            "WD24NM": match_row.get("WD24NM"),
-            "LAD24NM": match_row.get("LAD24NM"),
-            "WD24CD": match_row.get("WD24CD")
-        })
+    )
+    rows = district_rows.get(ward_keys["lad"].iat[i], [])
+    # Plain lower-case substring search, no regex compiled per ward
+    hits = np.char.find(wd_lower[rows], cleaned.lower()) != -1
+    if hits.any():
+        match_pos[i] = rows[int(hits.argmax())]
     else:
-        print(f"⚠️ No match found for Ward: {ward_name} ({district_name})")
-
-merged_df = pd.DataFrame(merged_rows)
+        print(f"⚠️ No match found for Ward: {ward_names[i]} ({district_names[i]})")
+
+matched = ~np.isnan(match_pos)
+geo = gdf.reindex(columns=["LAT", "LONG", "WD24NM", "LAD24NM", "WD24CD"]).iloc[match_pos[matched].astype(int)]
+merged_df = pd.DataFrame({
+    "Ward": ward_names[matched],
+    "District": district_names[matched],
+    "count": ward_counts["count"].to_numpy()[matched],
+    "latitude": geo["LAT"].to_numpy(),
+    "longitude": geo["LONG"].to_numpy(),
+    "WD24NM": geo["WD24NM"].to_numpy(),
+    "LAD24NM": geo["LAD24NM"].to_numpy(),
+    "WD24CD": geo["WD24CD"].to_numpy(),
+})
 
 # Drop rows with no coordinates before map
 before_len = len(merged_df)
@@ -101,9 +117,11 @@ removed = before_len - len(merged_df)
 if removed > 0:
     print(f"⚠️ Removed {removed} rows without coordinates before mapping.")
 
-# Save merged data
-with pd.ExcelWriter(output_file, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
+# Save base and merged data in one pass (no reopen in append mode)
+with pd.ExcelWriter(output_file, engine="openpyxl", mode="w") as writer:
+    ward_counts.to_excel(writer, sheet_name="Ward", index=False)
     merged_df.to_excel(writer, sheet_name="Ward_with_geo", index=False)
+print("✅ Ward + District counts written to Ward_Info.xlsx")
 print("✅ Ward_with_geo sheet updated with coordinates.")
 
 # -----------------------------
@@ -119,33 +137,36 @@ if not merged_df.empty:
 
     m = folium.Map(location=[center_lat, center_lon], zoom_start=6)
 
-    for _, r in merged_df.iterrows():
-        count = r["count"]
-        if count == 1:
-            color = "green"
-            radius = 6
-        elif r["Ward"] in top10:
-            color = "red"
-            radius = 8 + (count / max_count) * 14
-        else:
-            color = "orange"
-            radius = 6 + (count / max_count) * 10
-
-        popup_html = (
-            f"<b>Ward:</b> {r['Ward']}<br>"
-            f"<b>District:</b> {r['District']}<br>"
-            f"<b>Count:</b> {count}"
-        )
-
-        folium.CircleMarker(
-            location=[r["latitude"], r["longitude"]],
-            radius=radius,
-            popup=popup_html,
-            color=color,
-            fill=True,
-            fill_color=color,
-            fill_opacity=0.85
-        ).add_to(m)
+    # Marker colour and size for every ward at once; the loop only emits markers
+    counts = merged_df["count"].to_numpy()
+    is_one = counts == 1
+    is_top = merged_df["Ward"].isin(top10).to_numpy() & ~is_one
+    colors = np.where(is_one, "green", np.where(is_top, "red", "orange"))
+    radii = np.where(is_one, 6, np.where(is_top, 8 + (counts / max_count) * 14, 6 + (counts / max_count) * 10))
+
+    popups = [
+        f"<b>Ward:</b> {ward}<br>"
+        f"<b>District:</b> {district}<br>"
+        f"<b>Count:</b> {count}"
+        for ward, district, count in zip(merged_df["Ward"], merged_df["District"], counts.tolist())
+    ]
+    marker_rows = zip(merged_df["latitude"], merged_df["longitude"], colors.tolist(), radii.tolist(), popups)
+
+    if len(merged_df) > MARKER_CLUSTER_THRESHOLD:
+        # Too many wards for one SVG circle each: ship the rows as data and
+        # let the browser build the markers inside clusters on demand
+        FastMarkerCluster(data=[list(r) for r in marker_rows], callback=CLUSTER_MARKER_JS).add_to(m)
+    else:
+        for lat, lon, color, radius, popup_html in marker_rows:
+            folium.CircleMarker(
+                location=[lat, lon],
+                radius=radius,
+                popup=popup_html,
+                color=color,
+                fill=True,
+                fill_color=color,
+                fill_opacity=0.85
+            ).add_to(m)
 
     # Add legend
     legend_html = """